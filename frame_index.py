@@ -0,0 +1,322 @@
+"""
+Dance Motion Capture - Video Frame Index
+Records keyframe positions and exact frame counts/timestamps for a video so any
+frame can be read by decoding only from the nearest preceding keyframe
+"""
+
+import argparse
+import bisect
+import json
+import os
+import tempfile
+
+import cv2
+
+INDEX_VERSION = 2
+INDEX_SUFFIX = '.index.json'
+
+# Index timestamps must match what OpenCV reports after a seek to this
+# tolerance (ms) before the landed frame is trusted
+TIMESTAMP_TOLERANCE_MS = 0.5
+
+
+def get_index_path(video_path):
+    """Index files are cached next to the video, e.g. sample_videos/dance.mp4.index.json"""
+    return video_path + INDEX_SUFFIX
+
+
+def _scan_packets(video_path):
+    """
+    Read compressed packets without decoding them (FFmpeg backend only)
+
+    Returns:
+        List of (timestamp_ms, is_keyframe) in decode order, or None if raw
+        packet access is not available
+    """
+    if not hasattr(cv2, 'CAP_PROP_LRF_HAS_KEY_FRAME'):
+        return None
+
+    cap = None
+    try:
+        cap = cv2.VideoCapture(video_path, cv2.CAP_FFMPEG, [cv2.CAP_PROP_FORMAT, -1])
+        if not cap.isOpened() or cap.get(cv2.CAP_PROP_FORMAT) != -1:
+            return None
+
+        packets = []
+        while cap.grab():
+            packets.append((
+                cap.get(cv2.CAP_PROP_POS_MSEC),
+                bool(cap.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME))
+            ))
+        return packets
+    except Exception as e:
+        # Raw mode support varies between OpenCV builds; fall back to decoding
+        print(f"Warning: packet scan failed for {video_path}: {e}")
+        return None
+    finally:
+        if cap is not None:
+            cap.release()
+
+
+def _decode_timestamps(cap):
+    """Decode every frame and return its presentation timestamp (ms)"""
+    timestamps = []
+    while cap.grab():
+        timestamps.append(cap.get(cv2.CAP_PROP_POS_MSEC))
+    return timestamps
+
+
+def build_frame_index(video_path, decode_fallback=True):
+    """
+    Scan a video and build its frame index
+
+    Args:
+        video_path: Path to input video file
+        decode_fallback: Decode the whole video when packets can't give
+            frame timestamps
+
+    Returns:
+        Index dict with exact frame_count, per-frame timestamps (ms) and the
+        frame numbers of keyframes, or None if decoding would be needed and
+        decode_fallback is False
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise Exception(f"Cannot open video file {video_path}")
+
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+    packets = _scan_packets(video_path)
+    packet_timestamps = [packet[0] for packet in sorted(packets or [])]
+    if packets and all(after > before for before, after in zip(packet_timestamps, packet_timestamps[1:])):
+        # Packets arrive in decode order; B-frames make that differ from
+        # presentation order, so number frames by sorted timestamp
+        packets.sort(key=lambda packet: packet[0])
+        timestamps = packet_timestamps
+        keyframes = [frame for frame, packet in enumerate(packets) if packet[1]]
+        method = 'packets'
+    elif not decode_fallback:
+        cap.release()
+        return None
+    else:
+        # Older OpenCV (e.g. 4.8) gives raw packets no timestamps, so take the
+        # real ones from a decode pass
+        timestamps = _decode_timestamps(cap)
+        if packets and len(packets) == len(timestamps):
+            # Keyframe positions in decode order are at or before their
+            # presentation position, so they remain safe seek points
+            keyframes = [frame for frame, packet in enumerate(packets) if packet[1]]
+            method = 'packets_decode'
+        else:
+            # No keyframe information; seeks go through OpenCV's own seek
+            keyframes = [0] if timestamps else []
+            method = 'decode'
+
+    cap.release()
+
+    if timestamps and (not keyframes or keyframes[0] != 0):
+        # Leading frames that precede the first keyframe are only decodable from the start
+        keyframes.insert(0, 0)
+
+    stat = os.stat(video_path)
+    return {
+        "version": INDEX_VERSION,
+        "source_video": os.path.basename(video_path),
+        "video_size": stat.st_size,
+        "video_mtime": stat.st_mtime,
+        "method": method,
+        "fps": fps,
+        "width": width,
+        "height": height,
+        "frame_count": len(timestamps),
+        "keyframes": keyframes,
+        "timestamps": timestamps
+    }
+
+
+def _index_is_current(index, video_path):
+    stat = os.stat(video_path)
+    return (
+        index.get("version") == INDEX_VERSION and
+        index.get("video_size") == stat.st_size and
+        index.get("video_mtime") == stat.st_mtime
+    )
+
+
+def load_frame_index(video_path, rebuild=False, decode_fallback=True):
+    """
+    Load the cached index for a video, building and saving it when missing or stale
+
+    Args:
+        video_path: Path to input video file
+        rebuild: Ignore any cached index
+        decode_fallback: See build_frame_index; returns None instead of decoding
+    """
+    index_path = get_index_path(video_path)
+
+    if not rebuild and os.path.exists(index_path):
+        try:
+            with open(index_path, 'r') as f:
+                index = json.load(f)
+            if _index_is_current(index, video_path):
+                return index
+        except (OSError, ValueError):
+            pass
+
+    index = build_frame_index(video_path, decode_fallback)
+    if index is None:
+        return None
+
+    # Write to a temp file and swap it in so concurrent readers never see a
+    # partially written index
+    try:
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(index_path) or '.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(index, f)
+            os.replace(temp_path, index_path)
+        except Exception:
+            os.remove(temp_path)
+            raise
+    except OSError as e:
+        print(f"Warning: could not cache frame index {index_path}: {e}")
+
+    return index
+
+
+class FrameReader:
+    """
+    Random access frame reader backed by a frame index
+
+    Seeks land on the nearest keyframe at or before the requested frame and
+    decode forward from there; reads that move forward within the same GOP
+    continue from the current position without seeking. Indexes without
+    keyframe information ('decode') seek straight to the requested frame and
+    let OpenCV find its keyframe. Every seek is checked against the index
+    timestamps and falls back to decoding from the start. Not thread-safe.
+    """
+
+    def __init__(self, video_path, index=None):
+        self.video_path = video_path
+        self.index = index or load_frame_index(video_path)
+        self.frame_count = self.index["frame_count"]
+        self.fps = self.index["fps"]
+        self.timestamps = self.index["timestamps"]
+        self.keyframes = self.index["keyframes"]
+        self.keyframes_known = self.index["method"] != 'decode'
+
+        self.cap = None
+        self.position = 0  # Frame number the next grab() returns
+        self._open()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+    def _open(self):
+        self.close()
+        self.cap = cv2.VideoCapture(self.video_path)
+        if not self.cap.isOpened():
+            raise Exception(f"Cannot open video file {self.video_path}")
+        self.position = 0
+
+    def keyframe_for(self, frame_number):
+        """Nearest keyframe at or before frame_number"""
+        return self.keyframes[bisect.bisect_right(self.keyframes, frame_number) - 1]
+
+    def frame_at_time(self, timestamp_ms):
+        """Frame number whose timestamp is closest to timestamp_ms"""
+        i = bisect.bisect_left(self.timestamps, timestamp_ms)
+        if i == 0:
+            return 0
+        if i == len(self.timestamps):
+            return len(self.timestamps) - 1
+        before, after = self.timestamps[i - 1], self.timestamps[i]
+        return i - 1 if timestamp_ms - before <= after - timestamp_ms else i
+
+    def seek_point_for(self, frame_number):
+        """Frame to seek to before decoding forward to frame_number"""
+        if self.keyframes_known:
+            return self.keyframe_for(frame_number)
+        return frame_number
+
+    def _seek(self, target):
+        """Position the capture so the last grabbed frame is at or before target"""
+        if target == 0:
+            self._open()
+            return
+
+        self.cap.set(cv2.CAP_PROP_POS_MSEC, self.timestamps[target])
+        if self.cap.grab():
+            timestamp_ms = self.cap.get(cv2.CAP_PROP_POS_MSEC)
+            landed = self.frame_at_time(timestamp_ms)
+            # Only trust an exact timestamp match; anything else means the
+            # index and the video disagree about where we are
+            if abs(self.timestamps[landed] - timestamp_ms) <= TIMESTAMP_TOLERANCE_MS and landed <= target:
+                self.position = landed + 1
+                return
+
+        # OpenCV overshot or lost its place; decoding from the start is always exact
+        self._open()
+
+    def read_frame(self, frame_number):
+        """
+        Decode a single frame
+
+        Args:
+            frame_number: Frame number in presentation order
+
+        Returns:
+            BGR image as a numpy array
+        """
+        if not 0 <= frame_number < self.frame_count:
+            raise IndexError(f"Frame {frame_number} out of range (0-{self.frame_count - 1})")
+
+        # The frame most recently grabbed is position - 1
+        if self.cap is None:
+            self._open()
+
+        # Continue decoding from the current position unless seeking skips work
+        seek_point = self.seek_point_for(frame_number)
+        if not (seek_point <= self.position <= frame_number + 1):
+            self._seek(seek_point)
+
+        while self.position <= frame_number:
+            if not self.cap.grab():
+                raise Exception(f"Cannot decode frame {self.position} of {self.video_path}")
+            self.position += 1
+
+        success, image = self.cap.retrieve()
+        if not success:
+            raise Exception(f"Cannot decode frame {frame_number} of {self.video_path}")
+        return image
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build frame seek indexes for videos')
+    parser.add_argument('videos', nargs='+', help='Video files to index')
+    parser.add_argument('--rebuild', action='store_true', help='Rebuild even if a current index exists')
+
+    args = parser.parse_args()
+
+    for video_path in args.videos:
+        if not os.path.exists(video_path):
+            print(f"Error: Input file '{video_path}' does not exist")
+            continue
+
+        index = load_frame_index(video_path, rebuild=args.rebuild)
+        print(f"✓ {video_path}: {index['frame_count']} frames, "
+              f"{len(index['keyframes'])} keyframes ({index['method']}) -> {get_index_path(video_path)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,515 @@
+"""
+Dance Motion Capture - Server Load Test
+Drives concurrent upload / progress / output clients against a local server.py
+instance and reports latency percentiles, throughput and error rates per
+endpoint, plus server resource use over the whole run
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+import test_setup
+from frame_index import get_index_path
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(REPO_DIR, 'load_test_results')
+SAMPLE_MOTION_FILE = 'sample_motion.json'
+UPLOAD_PREFIX = 'loadtest_'
+
+ENDPOINT_UPLOAD = 'POST /upload'
+ENDPOINT_PROGRESS = 'GET /progress'
+ENDPOINT_OUTPUT = 'GET /output/<filename>'
+
+
+def create_synthetic_video(path, seconds=5, width=640, height=480, fps=30):
+    """
+    Write a synthetic video with a moving stick figure
+
+    Args:
+        path: Output video path (.mp4)
+        seconds: Video duration in seconds
+        width, height: Frame size in pixels
+        fps: Frames per second
+    """
+    os.makedirs(os.path.dirname(path) if os.path.dirname(path) else ".", exist_ok=True)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    if not writer.isOpened():
+        raise Exception(f"Cannot create video file {path}")
+
+    total_frames = int(seconds * fps)
+    scale = height / 480.0
+    for frame_num in range(total_frames):
+        t = frame_num / fps
+        image = np.full((height, width, 3), 40, dtype=np.uint8)
+
+        # Same jump / arm wave as test_setup's sample motion
+        cx = width // 2
+        hip_y = int(height * 0.6 - abs(np.sin(t * np.pi * 2)) * 60 * scale)
+        shoulder_y = hip_y - int(120 * scale)
+        arm = int(np.sin(t * np.pi * 4) * 50 * scale)
+        color = (200, 220, 255)
+        thickness = max(2, int(6 * scale))
+
+        cv2.circle(image, (cx, shoulder_y - int(40 * scale)), int(25 * scale), color, -1)
+        cv2.line(image, (cx, shoulder_y), (cx, hip_y), color, thickness)
+        cv2.line(image, (cx, shoulder_y), (cx - int(90 * scale), shoulder_y - arm), color, thickness)
+        cv2.line(image, (cx, shoulder_y), (cx + int(90 * scale), shoulder_y + arm), color, thickness)
+        cv2.line(image, (cx, hip_y), (cx - int(40 * scale), hip_y + int(130 * scale)), color, thickness)
+        cv2.line(image, (cx, hip_y), (cx + int(40 * scale), hip_y + int(130 * scale)), color, thickness)
+
+        writer.write(image)
+
+    writer.release()
+    return path
+
+
+def ensure_sample_motion():
+    """Make sure output/sample_motion.json exists for download clients"""
+    output_path = os.path.join(REPO_DIR, 'output', SAMPLE_MOTION_FILE)
+    if not os.path.exists(output_path):
+        cwd = os.getcwd()
+        try:
+            # test_setup writes relative to the working directory
+            os.chdir(REPO_DIR)
+            test_setup.create_sample_motion_data()
+        finally:
+            os.chdir(cwd)
+    return output_path
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = int(np.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(max(rank, 1), len(sorted_values)) - 1]
+
+
+def encode_multipart(field_name, filename, data, content_type='video/mp4'):
+    """Build a multipart/form-data body holding a single file field"""
+    boundary = uuid.uuid4().hex
+    head = (
+        f'--{boundary}\r\n'
+        f'Content-Disposition: form-data; name="{field_name}"; filename="{filename}"\r\n'
+        f'Content-Type: {content_type}\r\n\r\n'
+    ).encode('utf-8')
+    tail = f'\r\n--{boundary}--\r\n'.encode('utf-8')
+    return head + data + tail, f'multipart/form-data; boundary={boundary}'
+
+
+def http_request(url, data=None, headers=None, timeout=60):
+    """
+    Issue a request and read the whole response
+
+    Returns:
+        (status, response_bytes) where status is None for connection errors
+    """
+    req = urllib.request.Request(url, data=data, headers=headers or {})
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+    except Exception as e:
+        return None, str(e).encode('utf-8')
+
+
+class LoadStats:
+    """Thread-safe per-endpoint request log"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.records = {}
+
+    def record(self, endpoint, latency, status, nbytes):
+        with self.lock:
+            self.records.setdefault(endpoint, []).append((latency, status, nbytes))
+
+    def summary(self, duration):
+        """Aggregate the log into latency percentiles, throughput and errors"""
+        endpoints = {}
+        with self.lock:
+            items = {name: list(records) for name, records in self.records.items()}
+
+        for name, records in sorted(items.items()):
+            latencies = sorted(r[0] * 1000.0 for r in records)
+            errors = {}
+            for _, status, _ in records:
+                if status is None or status >= 400:
+                    key = str(status) if status is not None else 'connection'
+                    errors[key] = errors.get(key, 0) + 1
+            error_count = sum(errors.values())
+
+            endpoints[name] = {
+                'requests': len(records),
+                'errors': error_count,
+                'error_rate': error_count / len(records),
+                'error_breakdown': errors,
+                'throughput_rps': len(records) / duration if duration > 0 else 0.0,
+                'bytes': sum(r[2] for r in records),
+                'latency_ms': {
+                    'mean': sum(latencies) / len(latencies),
+                    'p50': percentile(latencies, 50),
+                    'p90': percentile(latencies, 90),
+                    'p95': percentile(latencies, 95),
+                    'p99': percentile(latencies, 99),
+                    'max': latencies[-1]
+                }
+            }
+        return endpoints
+
+
+class ResourceSampler(threading.Thread):
+    """Periodically samples CPU / memory of the server process and its children"""
+
+    def __init__(self, pid, interval=0.5):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.samples = []
+        self.stop_event = threading.Event()
+
+    def _processes(self, root):
+        try:
+            return [root] + root.children(recursive=True)
+        except psutil.Error:
+            return [root]
+
+    def run(self):
+        root = psutil.Process(self.pid)
+        known = {}
+        while not self.stop_event.is_set():
+            cpu = 0.0
+            rss = 0
+            threads = 0
+            for proc in self._processes(root):
+                try:
+                    # cpu_percent() measures since the previous call on the same object
+                    proc = known.setdefault(proc.pid, proc)
+                    cpu += proc.cpu_percent(None)
+                    rss += proc.memory_info().rss
+                    threads += proc.num_threads()
+                except psutil.Error:
+                    continue
+            self.samples.append({'cpu_percent': cpu, 'rss_mb': rss / (1024 * 1024), 'threads': threads})
+            self.stop_event.wait(self.interval)
+
+    def stop(self):
+        self.stop_event.set()
+        self.join()
+
+    def summary(self):
+        # First sample only primes cpu_percent()
+        samples = self.samples[1:] or self.samples
+        if not samples:
+            return None
+        cpu = [s['cpu_percent'] for s in samples]
+        return {
+            'samples': len(samples),
+            'cpu_percent_mean': sum(cpu) / len(cpu),
+            'cpu_percent_max': max(cpu),
+            'rss_mb_max': max(s['rss_mb'] for s in samples),
+            'threads_max': max(s['threads'] for s in samples)
+        }
+
+
+def start_local_server(port, timeout=60):
+    """
+    Start server.py's app on the given port (without the debug reloader)
+
+    Server output goes to load_test_results/logs/ so per-request log lines
+    neither flood the report nor slow the server down with console writes.
+
+    Returns:
+        (process, base_url, log_path)
+    """
+    # A server already on the port would answer the startup check instead
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        if sock.connect_ex(('127.0.0.1', port)) == 0:
+            raise Exception(f"Port {port} is already in use; pick another with --port")
+
+    log_dir = os.path.join(RESULTS_DIR, 'logs')
+    os.makedirs(log_dir, exist_ok=True)
+    log_path = os.path.join(log_dir, f"server_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{port}.log")
+
+    code = (
+        "from server import app; "
+        f"app.run(host='127.0.0.1', port={port}, threaded=True, debug=False)"
+    )
+    with open(log_path, 'w') as log_file:
+        process = subprocess.Popen([sys.executable, '-c', code], cwd=REPO_DIR,
+                                   stdout=log_file, stderr=subprocess.STDOUT)
+
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise Exception(f"Server exited with code {process.returncode} (see {log_path})")
+        status, _ = http_request(base_url + '/progress', timeout=2)
+        if status == 200 and process.poll() is None:
+            return process, base_url, log_path
+        time.sleep(0.5)
+
+    process.terminate()
+    raise Exception(f"Server did not start within {timeout}s (see {log_path})")
+
+
+def run_clients(base_url, video_data, args, stats, uploaded):
+    """Run the configured client mix until the test duration has elapsed"""
+    stop_event = threading.Event()
+    uploaded_lock = threading.Lock()
+
+    def upload_client():
+        while not stop_event.is_set():
+            filename = f'{UPLOAD_PREFIX}{uuid.uuid4().hex[:12]}.mp4'
+            body, content_type = encode_multipart('video', filename, video_data)
+            start = time.perf_counter()
+            status, _ = http_request(base_url + '/upload', data=body,
+                                            headers={'Content-Type': content_type},
+                                            timeout=args.timeout)
+            stats.record(ENDPOINT_UPLOAD, time.perf_counter() - start, status, len(body))
+            with uploaded_lock:
+                uploaded.append(filename)
+            stop_event.wait(args.upload_interval)
+
+    def progress_client():
+        while not stop_event.is_set():
+            start = time.perf_counter()
+            status, response = http_request(base_url + '/progress', timeout=args.timeout)
+            stats.record(ENDPOINT_PROGRESS, time.perf_counter() - start, status, len(response))
+            stop_event.wait(args.poll_interval)
+
+    def download_client():
+        url = base_url + '/output/' + args.motion_file
+        while not stop_event.is_set():
+            start = time.perf_counter()
+            status, response = http_request(url, timeout=args.timeout)
+            stats.record(ENDPOINT_OUTPUT, time.perf_counter() - start, status, len(response))
+            stop_event.wait(args.download_interval)
+
+    clients = (
+        [upload_client] * args.uploaders +
+        [progress_client] * args.pollers +
+        [download_client] * args.downloaders
+    )
+    threads = [threading.Thread(target=client, daemon=True) for client in clients]
+
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop_event.set()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def cleanup_uploads(filenames):
+    """Remove uploaded videos and any motion / index files the server produced for them"""
+    for filename in filenames:
+        video_path = os.path.join(REPO_DIR, 'sample_videos', filename)
+        paths = [
+            video_path,
+            get_index_path(video_path),
+            os.path.join(REPO_DIR, 'output', filename.rsplit('.', 1)[0] + '_motion.json')
+        ]
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def run_load_test(args):
+    """Prepare inputs, run the client mix and return the result record"""
+    # Inputs
+    if args.video:
+        video_path = args.video
+    else:
+        width, height = (int(v) for v in args.video_size.lower().split('x'))
+        video_path = os.path.join(RESULTS_DIR, 'inputs',
+                                  f'synthetic_{width}x{height}_{args.video_seconds}s.mp4')
+        if not os.path.exists(video_path):
+            print(f"Creating synthetic video: {video_path}")
+            create_synthetic_video(video_path, args.video_seconds, width, height)
+    with open(video_path, 'rb') as f:
+        video_data = f.read()
+
+    if args.motion_file == SAMPLE_MOTION_FILE:
+        ensure_sample_motion()
+
+    # Server
+    server_process = None
+    if args.url:
+        base_url = args.url.rstrip('/')
+        server_pid = args.server_pid
+    else:
+        print(f"Starting local server on port {args.port}...")
+        server_process, base_url, log_path = start_local_server(args.port)
+        server_pid = server_process.pid
+        print(f"Server log: {log_path}")
+
+    sampler = None
+    if server_pid and psutil is not None:
+        sampler = ResourceSampler(server_pid)
+        sampler.start()
+    elif server_pid:
+        print("psutil not installed - server resource use will not be reported")
+
+    stats = LoadStats()
+    uploaded = []
+    print(f"Running {args.uploaders} uploader(s), {args.pollers} poller(s), "
+          f"{args.downloaders} downloader(s) for {args.duration}s against {base_url}")
+
+    try:
+        elapsed = run_clients(base_url, video_data, args, stats, uploaded)
+    finally:
+        if sampler is not None:
+            sampler.stop()
+        if server_process is not None:
+            server_process.terminate()
+            server_process.wait()
+        # Only the local server is known to store files in this checkout, and
+        # it has been stopped so nothing is written after cleanup
+        if server_process is not None and not args.keep_uploads:
+            cleanup_uploads(uploaded)
+
+    return {
+        'name': args.name,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'base_url': base_url,
+        'config': {
+            'duration': args.duration,
+            'uploaders': args.uploaders,
+            'pollers': args.pollers,
+            'downloaders': args.downloaders,
+            'upload_interval': args.upload_interval,
+            'poll_interval': args.poll_interval,
+            'download_interval': args.download_interval,
+            'video': os.path.basename(video_path),
+            'video_bytes': len(video_data),
+            'motion_file': args.motion_file
+        },
+        'elapsed': elapsed,
+        'endpoints': stats.summary(elapsed),
+        'server_resources': sampler.summary() if sampler is not None else None
+    }
+
+
+def print_report(result):
+    """Print a per-endpoint summary table"""
+    print("\n" + "=" * 60)
+    print(f"Load Test Results ({result['elapsed']:.1f}s)")
+    print("=" * 60)
+
+    for name, endpoint in result['endpoints'].items():
+        latency = endpoint['latency_ms']
+        print(f"\n{name}")
+        print(f"  Requests:   {endpoint['requests']} ({endpoint['throughput_rps']:.1f} req/s)")
+        print(f"  Errors:     {endpoint['errors']} ({endpoint['error_rate'] * 100:.1f}%)"
+              + (f" {endpoint['error_breakdown']}" if endpoint['errors'] else ""))
+        print(f"  Latency ms: p50={latency['p50']:.1f} p90={latency['p90']:.1f} "
+              f"p95={latency['p95']:.1f} p99={latency['p99']:.1f} max={latency['max']:.1f}")
+
+    resources = result['server_resources']
+    if resources:
+        print("\nServer resources (whole run, all endpoints)")
+        print(f"  CPU:     mean={resources['cpu_percent_mean']:.1f}% max={resources['cpu_percent_max']:.1f}%")
+        print(f"  Memory:  max={resources['rss_mb_max']:.1f} MB")
+        print(f"  Threads: max={resources['threads_max']}")
+
+
+def print_comparison(baseline, result):
+    """Print p95 latency / throughput / error rate deltas against a saved run"""
+    print("\n" + "=" * 60)
+    print(f"Comparison with {baseline.get('name') or baseline['timestamp']}")
+    print("=" * 60)
+
+    for name, endpoint in result['endpoints'].items():
+        previous = baseline['endpoints'].get(name)
+        if previous is None:
+            print(f"\n{name}: not present in baseline")
+            continue
+        p95 = endpoint['latency_ms']['p95']
+        previous_p95 = previous['latency_ms']['p95']
+        print(f"\n{name}")
+        print(f"  p95 ms:     {previous_p95:.1f} -> {p95:.1f} ({p95 - previous_p95:+.1f})")
+        print(f"  req/s:      {previous['throughput_rps']:.1f} -> {endpoint['throughput_rps']:.1f}")
+        print(f"  error rate: {previous['error_rate'] * 100:.1f}% -> {endpoint['error_rate'] * 100:.1f}%")
+
+
+def save_result(result):
+    """Save the result record under load_test_results/"""
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    filename = f"{stamp}_{result['name']}.json" if result['name'] else f"{stamp}.json"
+    output_path = os.path.join(RESULTS_DIR, filename)
+
+    with open(output_path, 'w') as f:
+        json.dump(result, f, indent=2)
+
+    return output_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the dance motion capture server')
+    parser.add_argument('--url', help='Base URL of an already running server; uploads are '
+                        'not cleaned up (default: start a local server.py instance)')
+    parser.add_argument('--server-pid', type=int,
+                        help='PID of the server given by --url, for resource sampling')
+    parser.add_argument('--port', type=int, default=5055,
+                        help='Port for the locally started server (default: 5055)')
+    parser.add_argument('--duration', type=float, default=30, help='Test duration in seconds (default: 30)')
+    parser.add_argument('--uploaders', type=int, default=1, help='Concurrent upload clients (default: 1)')
+    parser.add_argument('--pollers', type=int, default=10, help='Concurrent /progress clients (default: 10)')
+    parser.add_argument('--downloaders', type=int, default=5, help='Concurrent /output clients (default: 5)')
+    parser.add_argument('--upload-interval', type=float, default=5.0,
+                        help='Seconds between uploads per client (default: 5)')
+    parser.add_argument('--poll-interval', type=float, default=0.5,
+                        help='Seconds between /progress polls per client (default: 0.5)')
+    parser.add_argument('--download-interval', type=float, default=1.0,
+                        help='Seconds between downloads per client (default: 1)')
+    parser.add_argument('--timeout', type=float, default=60, help='Per-request timeout in seconds (default: 60)')
+    parser.add_argument('--video', help='Video to upload (default: generate a synthetic one)')
+    parser.add_argument('--video-seconds', type=int, default=5,
+                        help='Synthetic video duration in seconds (default: 5)')
+    parser.add_argument('--video-size', default='640x480', help='Synthetic video size (default: 640x480)')
+    parser.add_argument('--motion-file', default=SAMPLE_MOTION_FILE,
+                        help='File in output/ to download (default: sample_motion.json from test_setup.py)')
+    parser.add_argument('--keep-uploads', action='store_true',
+                        help='Keep uploaded videos and their motion / index files after the run '
+                        '(cleanup only applies to the locally started server)')
+    parser.add_argument('--name', default='', help='Label stored with the saved results')
+    parser.add_argument('--compare', help='Saved results JSON to compare this run against')
+
+    args = parser.parse_args()
+
+    result = run_load_test(args)
+    print_report(result)
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            print_comparison(json.load(f), result)
+
+    output_path = save_result(result)
+    print(f"\n✓ Results saved to {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,8 +3,10 @@ Flask server for processing dance videos in real-time
 Handles video upload and MediaPipe pose extraction
 """
 
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify, send_from_directory, send_file
 from flask_cors import CORS
+from werkzeug.utils import safe_join
+import io
 import os
 import json
 import cv2
@@ -12,6 +14,8 @@ import mediapipe as mp
 from pathlib import Path
 import tempfile
 import threading
+from collections import OrderedDict
+from frame_index import FrameReader, load_frame_index
 
 app = Flask(__name__, static_folder='.')
 CORS(app)
@@ -38,6 +42,17 @@ class PoseExtractorServer:
         # Get video properties
         fps = cap.get(cv2.CAP_PROP_FPS)
         frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        
+        # CAP_PROP_FRAME_COUNT is an estimate; the frame index counts packets.
+        # Only build it when that is cheap (no extra decode pass); it is then
+        # also cached for /frame previews
+        try:
+            index = load_frame_index(video_path, decode_fallback=False)
+            if index is not None:
+                frame_count = index['frame_count']
+        except Exception as e:
+            print(f"Warning: could not index {video_path}: {e}")
+        
         width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
         height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
         
@@ -124,6 +139,50 @@ class PoseExtractorServer:
 
 extractor = PoseExtractorServer()
 
+# Open frame readers for /frame previews, keyed by video path, least recently used first
+MAX_FRAME_READERS = 4
+frame_readers = OrderedDict()
+frame_readers_lock = threading.Lock()
+
+def _reader_is_current(reader, stat):
+    return reader.index['video_size'] == stat.st_size and reader.index['video_mtime'] == stat.st_mtime
+
+def get_frame_reader(video_path):
+    """Return a (reader, lock) pair for the video, reopening it if the file changed"""
+    stat = os.stat(video_path)
+    
+    with frame_readers_lock:
+        entry = frame_readers.get(video_path)
+        if entry is not None and _reader_is_current(entry[0], stat):
+            frame_readers.move_to_end(video_path)
+            return entry
+    
+    # Opening may index the whole video, so don't block other videos meanwhile
+    new_entry = (FrameReader(video_path), threading.Lock())
+    
+    closing = []
+    with frame_readers_lock:
+        entry = frame_readers.get(video_path)
+        if entry is not None and _reader_is_current(entry[0], stat):
+            # Another request opened it first
+            closing.append(new_entry)
+            frame_readers.move_to_end(video_path)
+        else:
+            if entry is not None:
+                closing.append(entry)
+            entry = new_entry
+            frame_readers[video_path] = entry
+            while len(frame_readers) > MAX_FRAME_READERS:
+                closing.append(frame_readers.popitem(last=False)[1])
+    
+    # Readers still in use finish their current read first; FrameReader
+    # reopens itself if a request that already holds it reads again
+    for reader, lock in closing:
+        with lock:
+            reader.close()
+    
+    return entry
+
 def process_video_async(video_path, output_path):
     """Process video in background thread"""
     global processing_status
@@ -213,6 +272,60 @@ def get_output(filename):
     """Serve the generated motion data JSON file"""
     return send_from_directory('output', filename)
 
+@app.route('/frame/<filename>/<int:frame_number>', methods=['GET'])
+def get_frame(filename, frame_number):
+    """Serve a single decoded frame of an uploaded video as JPEG
+    
+    Query parameters:
+        width: Scale the frame down to this width for a thumbnail
+        quality: JPEG quality 1-100 (default 85)
+    """
+    video_path = safe_join('sample_videos', filename)
+    if video_path is None or not os.path.isfile(video_path):
+        return jsonify({'error': 'Video not found'}), 404
+    
+    width = request.args.get('width', type=int)
+    quality = request.args.get('quality', 85, type=int)
+    if (width is not None and width <= 0) or not 1 <= quality <= 100:
+        return jsonify({'error': 'Invalid width or quality'}), 400
+    
+    try:
+        reader, lock = get_frame_reader(video_path)
+    except Exception as e:
+        return jsonify({'error': f'Not a readable video: {e}'}), 400
+    
+    try:
+        with lock:
+            if not 0 <= frame_number < reader.frame_count:
+                return jsonify({'error': f'Frame out of range (0-{reader.frame_count - 1})'}), 404
+            image = reader.read_frame(frame_number)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    
+    if width is not None and width < image.shape[1]:
+        height = max(1, round(image.shape[0] * width / image.shape[1]))
+        image = cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
+    
+    success, encoded = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not success:
+        return jsonify({'error': 'Cannot encode frame'}), 500
+    
+    return send_file(io.BytesIO(encoded.tobytes()), mimetype='image/jpeg')
+
+@app.route('/frame_index/<filename>', methods=['GET'])
+def get_video_frame_index(filename):
+    """Serve frame count, timestamps and keyframes of an uploaded video"""
+    video_path = safe_join('sample_videos', filename)
+    if video_path is None or not os.path.isfile(video_path):
+        return jsonify({'error': 'Video not found'}), 404
+    
+    try:
+        index = load_frame_index(video_path)
+    except Exception as e:
+        return jsonify({'error': f'Not a readable video: {e}'}), 400
+    
+    return jsonify(index)
+
 if __name__ == '__main__':
     print("=" * 60)
     print("Dance Motion Capture Server")